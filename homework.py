@@ -1,9 +1,14 @@
 import logging
 import os
+import random
+import signal
 import sys
 import time
+from collections import OrderedDict
 from contextlib import suppress
+from functools import lru_cache
 from http import HTTPStatus
+from typing import Optional
 
 import requests
 from dotenv import load_dotenv
@@ -15,9 +20,15 @@ PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 
+TOKEN_NAMES = ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID')
+
 RETRY_PERIOD = 600
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+REQUEST_TIMEOUT = (5, 30)
+BACKOFF_MAX = 3600
+SEEN_CACHE_LIMIT = 256
+TELEGRAM_MESSAGE_LIMIT = 4096
 
 HOMEWORK_VERDICTS = {
     'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
@@ -25,6 +36,12 @@ HOMEWORK_VERDICTS = {
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
 
+STATUS_CHANGED_TEMPLATE = 'Изменился статус проверки работы "%s". %s'
+API_UNAVAILABLE_TEMPLATE = 'Эндпоинт API недоступен: %s'
+PROGRAM_FAILURE_TEMPLATE = 'Сбой в работе программы: %s'
+
+_conditional_headers = {}
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 formatter = logging.Formatter(
@@ -40,11 +57,10 @@ def check_tokens() -> None:
     Проверка токенов Практикума и
     Bot API, id чата получателя. Возвращает булево значение.
     """
-    venv_tokens = ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID')
-    missng_tokens = [token for token in venv_tokens if not globals()[token]]
-    if missng_tokens:
+    missing_tokens = [token for token in TOKEN_NAMES if not globals()[token]]
+    if missing_tokens:
         message = (
-            f'Отсутсвуют переменные окружения: {", ".join(missng_tokens)}')
+            f'Отсутсвуют переменные окружения: {", ".join(missing_tokens)}')
         logger.critical(message)
         raise ValueError(message)
 
@@ -55,32 +71,45 @@ def send_message(bot: TeleBot, message: str) -> None:
     Принимает на вход два параметра:
     экземпляр класса TeleBot и строку с текстом сообщения.
     """
-    logger.debug(f'Отправляем сообщение: {message}')
+    logger.debug('Отправляем сообщение: %s', message)
     bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message)
-    logger.debug(f'Сообщение отправлено. {message}')
+    logger.debug('Сообщение отправлено. %s', message)
 
 
-def get_api_answer(timestamp: int) -> dict:
+def get_api_answer(timestamp: int) -> Optional[dict]:
     """
     Делает запрос к единственному эндпоинту API-сервиса.
     В качестве параметра в функцию передаётся временная метка.
     В случае успешного запроса должна вернуть ответ API, приведя его из
-    формата JSON к типам данных Python.
+    формата JSON к типам данных Python. Если по условным заголовкам
+    If-None-Match/If-Modified-Since сервер ответил 304, возвращает None.
     """
-    logger.debug(f'Получаем ответ от API за последние {timestamp}')
+    logger.debug('Получаем ответ от API за последние %s', timestamp)
+    headers = {**HEADERS, **_conditional_headers}
     try:
         homework_statuses = requests.get(ENDPOINT,
-                                         headers=HEADERS,
-                                         params={'from_date': timestamp})
+                                         headers=headers,
+                                         params={'from_date': timestamp},
+                                         timeout=REQUEST_TIMEOUT)
 
     except requests.RequestException as error:
-        message = f'Эндпоинт API недоступен: {error}'
-        raise ConnectionError(message)
+        raise ConnectionError(API_UNAVAILABLE_TEMPLATE % error)
+
+    if homework_statuses.status_code == HTTPStatus.NOT_MODIFIED:
+        return None
 
     if homework_statuses.status_code != HTTPStatus.OK:
         raise ValueError(
             f'Ошибка при запросе к API: {homework_statuses.status_code}')
 
+    response_headers = getattr(homework_statuses, 'headers', {})
+    etag = response_headers.get('ETag')
+    if etag:
+        _conditional_headers['If-None-Match'] = etag
+    last_modified = response_headers.get('Last-Modified')
+    if last_modified:
+        _conditional_headers['If-Modified-Since'] = last_modified
+
     return homework_statuses.json()
 
 
@@ -93,11 +122,22 @@ def check_response(response: dict) -> None:
     logger.debug('Проверяем ответ API')
     if not isinstance(response, dict):
         raise TypeError(f'Ответ не содержит словарь {type(response)}')
-    homeworks = response.get('homeworks')
-    if not homeworks:
+    if 'homeworks' not in response:
         raise KeyError('В ответе отсутсвует ключ "homeworks"')
+    homeworks = response['homeworks']
     if not isinstance(homeworks, list):
-        raise TypeError(f'Ответ не содержит словарь {type(response)}')
+        raise TypeError(
+            f'Под ключом "homeworks" ожидается список {type(homeworks)}')
+
+
+@lru_cache(maxsize=512)
+def render_status(homework_name: str, status: str) -> str:
+    """
+    Форматирует сообщение о смене статуса домашней работы.
+    Повторные пары (homework_name, status) берутся из кеша,
+    а не форматируются заново.
+    """
+    return STATUS_CHANGED_TEMPLATE % (homework_name, HOMEWORK_VERDICTS[status])
 
 
 def parse_status(homework: dict) -> str:
@@ -108,24 +148,62 @@ def parse_status(homework: dict) -> str:
     подготовленную для отправки в Telegram строку, содержащую один из
     вердиктов словаря HOMEWORK_VERDICTS
     """
-    logger.debug(f'Получаем статус домашней работы: {homework}')
-    try:
-        homework_name = homework['homework_name']
+    logger.debug('Получаем статус домашней работы: %r', homework)
+    homework_name = homework.get('homework_name')
+    if homework_name is None:
+        raise KeyError('Ключ "homework_name" отсутсвует в домашней работе')
+    status = homework.get('status')
+    if status not in HOMEWORK_VERDICTS:
+        raise ValueError(f'Неизвестный статус домашней работы: {status}')
+    return render_status(homework_name, status)
 
-    except KeyError as error:
-        message = f'Ключ {error} отсутсвует в домашней работе'
-        raise KeyError(message)
 
-    if not homework.get('status'):
-        raise KeyError('Ключ "status" отсутсвует в домашней работе')
-    try:
-        verdict = HOMEWORK_VERDICTS[homework['status']]
+def send_batch(bot: TeleBot, lines: list, keys: list, seen: OrderedDict):
+    """
+    Отправляет набор статусов одним сообщением.
+    После успешной отправки помечает пары (id, status) в кеше seen,
+    ограниченном SEEN_CACHE_LIMIT записями.
+    """
+    send_message(bot, '\n\n'.join(lines))
+    for key in keys:
+        seen[key] = True
+        if len(seen) > SEEN_CACHE_LIMIT:
+            seen.popitem(last=False)
 
-    except KeyError as error:
-        message = f'{error}. Неизвестный статус домашней работы'
-        raise ValueError(message)
 
-    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+def process_homeworks(bot: TeleBot, homeworks: list, seen: OrderedDict):
+    """
+    Отправляет уведомления о новых статусах из списка домашних работ.
+    Уже увиденные пары (id, status) пропускаются, новые объединяются в
+    одно сообщение вместо отдельной отправки каждого статуса; если
+    суммарный текст не помещается в лимит Telegram, он разбивается на
+    несколько сообщений.
+    """
+    batch = []
+    batch_keys = []
+    length = 0
+    for homework in homeworks:
+        key = (homework.get('id'), homework.get('status'))
+        if key in seen:
+            continue
+        line = parse_status(homework)
+        if batch and length + len(line) + 2 > TELEGRAM_MESSAGE_LIMIT:
+            send_batch(bot, batch, batch_keys, seen)
+            batch, batch_keys, length = [], [], 0
+        batch.append(line)
+        batch_keys.append(key)
+        length += len(line) + 2
+    if batch:
+        send_batch(bot, batch, batch_keys, seen)
+
+
+def handle_sigterm(signum, frame):
+    """
+    Обрабатывает сигнал SIGTERM.
+    Поднимает SystemExit, чтобы прервать time.sleep в цикле опроса и
+    завершить работу бота сразу, не дожидаясь конца паузы.
+    """
+    raise SystemExit('Получен SIGTERM, завершаем работу')
 
 
 def main():
@@ -136,38 +214,63 @@ def main():
     timestamp = int(time.time())
 
     last_message = ''
+    last_error = ''
+    error_streak = 0
+    error_repeats = 0
+    seen = OrderedDict()
 
     while True:
         try:
             homework_statuses = get_api_answer(timestamp)
+            if homework_statuses is None:
+                logger.debug('Статусы домашних работ не менялись')
+                error_streak = 0
+                error_repeats = 0
+                continue
             check_response(homework_statuses)
             homeworks = homework_statuses.get('homeworks')
             if homeworks:
-                message = parse_status(homeworks[0])
-                if message != last_message:
-                    send_message(bot, message)
-                    last_message = message
+                process_homeworks(bot, homeworks, seen)
             else:
                 logger.info('Отсутсвует обновление статуса домашней работы')
 
             timestamp = homework_statuses.get('current_date', timestamp)
+            error_streak = 0
+            error_repeats = 0
 
         except apihelper.ApiTelegramException as telegram_error:
-            logger.error(f'Ошибка Telegram: {telegram_error}', exc_info=True)
+            error_streak += 1
+            logger.error(
+                'Ошибка Telegram: %s', telegram_error, exc_info=True)
 
         except Exception as error:
-            message = f'Сбой в работе программы: {error}'
+            error_streak += 1
+            message = PROGRAM_FAILURE_TEMPLATE % error
 
             if message != last_message:
                 with suppress(Exception):
                     send_message(bot, message)
                     last_message = message
 
-            logger.error(message, exc_info=True)
+            if message == last_error:
+                error_repeats += 1
+            else:
+                last_error = message
+                error_repeats = 1
+            logger.error(
+                message,
+                exc_info=error_repeats == 1 or error_repeats % 50 == 0)
 
         finally:
-            time.sleep(RETRY_PERIOD)
+            if error_streak:
+                delay = random.uniform(
+                    RETRY_PERIOD,
+                    min(BACKOFF_MAX, RETRY_PERIOD * 2 ** (error_streak - 1)))
+            else:
+                delay = RETRY_PERIOD
+            time.sleep(delay)
 
 
 if __name__ == '__main__':
+    signal.signal(signal.SIGTERM, handle_sigterm)
     main()